@@ -10,14 +10,27 @@ Fixes:
 Requirements:
 - PySide6
 - PySide6-QtWebEngine
+- difflib_rs (optional; faster diff.html generation)
 """
 
 import os
 import sys
+import mmap
+import time
 import re
 import difflib
+from string import Template
+import functools
+import html as html_mod
+from itertools import zip_longest
 from pathlib import Path
 
+# Optional Rust-backed diff (same signature as difflib.unified_diff); fall back to the stdlib.
+try:
+    from difflib_rs import unified_diff as _udiff
+except ImportError:
+    _udiff = difflib.unified_diff
+
 # Optionally silence Chromium GPU logs; keep commented unless needed.
 # os.environ['QTWEBENGINE_CHROMIUM_FLAGS'] = '--disable-gpu --disable-software-rasterizer --disable-gpu-compositing'
 
@@ -25,7 +38,7 @@ from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QGridLayout, QVBoxLayout, QHBoxLayout,
     QPlainTextEdit, QFileDialog, QMessageBox, QLabel, QPushButton, QListWidget, QListWidgetItem, QCheckBox
 )
-from PySide6.QtCore import Qt, QUrl
+from PySide6.QtCore import Qt, QUrl, QObject, QRunnable, QThread, QThreadPool, QTimer, Signal, Slot
 from PySide6.QtWebEngineWidgets import QWebEngineView
 
 from PySide6.QtGui import (
@@ -59,6 +72,16 @@ FLAG_ALIASES = {
     "RE.A": re.ASCII,
 }
 
+# single-letter flags (the common case) indexed by ord() of the upper-cased letter
+_SHORT_FLAGS = [0] * 256
+for _name, _val in FLAG_ALIASES.items():
+    if len(_name) == 1:
+        _SHORT_FLAGS[ord(_name)] = _val
+del _name, _val
+
+_FLAGS_RE = re.compile(r"flags\s*:\s*(.*)$", re.IGNORECASE)
+_SPLIT_RE = re.compile(r"[,\|;\s]+")
+
 FLAG_DISPLAY = [
     ("IGNORECASE", re.IGNORECASE),
     ("MULTILINE", re.MULTILINE),
@@ -68,29 +91,30 @@ FLAG_DISPLAY = [
 ]
 
 
+# the same few flag strings repeat on most lines, so results are memoised
+@functools.lru_cache(maxsize=256)
 def parse_flag_tokens(tok_text: str) -> int:
     if not tok_text:
         return 0
     combined = 0
-    toks = re.split(r"[,\|;\s]+", tok_text.strip())
+    toks = _SPLIT_RE.split(tok_text.strip().upper())
     for t in toks:
-        if not t:
-            continue
-        key = t.strip().upper()
-        if key in FLAG_ALIASES:
-            combined |= FLAG_ALIASES[key]
-        else:
-            if len(key) == 1 and key in FLAG_ALIASES:
-                combined |= FLAG_ALIASES[key]
+        if len(t) == 1:
+            c = ord(t)
+            if c < 256:
+                combined |= _SHORT_FLAGS[c]
+        elif t:
+            combined |= FLAG_ALIASES.get(t, 0)
     return combined
 
 
-def flags_to_tokens(flags_int: int) -> list:
+@functools.lru_cache(maxsize=64)
+def flags_to_tokens(flags_int: int) -> tuple:
     tokens = []
     for name, val in FLAG_DISPLAY:
         if val != re.MULTILINE and (flags_int & val):
             tokens.append(name)
-    return tokens
+    return tuple(tokens)
 
 
 def parse_pattern_line(line: str):
@@ -100,7 +124,7 @@ def parse_pattern_line(line: str):
 
     flags_text = ""
     if flags_part:
-        m = re.search(r"flags\s*:\s*(.*)$", flags_part, flags=re.IGNORECASE)
+        m = _FLAGS_RE.search(flags_part)
         if m:
             flags_text = m.group(1).strip()
         else:
@@ -119,9 +143,499 @@ def parse_pattern_line(line: str):
     return pattern, replacement, flags
 
 
+def parse_rules_for_display(text: str) -> list:
+    """Return (display_string, line_index) for every rule line in the patterns text."""
+    entries = []
+    for idx, ln in enumerate(text.splitlines()):
+        stripped = ln.strip()
+        if not stripped or stripped.startswith("#"):
+            continue
+        entries.append((_rule_display(ln), idx))
+    return entries
+
+
+# unescaped .* / .+ ; more than one in a pattern risks catastrophic backtracking when it fails to match
+_GREEDY_DOT_RE = re.compile(r"(?<!\\)\.[*+]")
+
+
+# keyed by the raw line, so lines untouched by an edit are not re-parsed/re-formatted on reparse
+@functools.lru_cache(maxsize=4096)
+def _rule_display(ln: str) -> str:
+    try:
+        pat, repl, flags = parse_pattern_line(ln)
+        flag_tokens = flags_to_tokens(flags)
+        flags_display = (", ".join(flag_tokens)) if flag_tokens else ""
+        display = f"{pat}  ->  {repl}"
+        if flags_display:
+            display += f"   [{flags_display}]"
+        if len(_GREEDY_DOT_RE.findall(pat)) > 1:
+            display += "   [warning: several .* / .+ can backtrack badly on long text]"
+    except Exception:
+        display = f"(parse error) {ln}"
+    return display
+
+
+# -------------------------
+# Background rules parsing
+# -------------------------
+class RulesParseSignals(QObject):
+    finished = Signal(int, list)
+
+
+class RulesParseWorker(QRunnable):
+    def __init__(self, generation: int, text: str):
+        super().__init__()
+        self.generation = generation
+        self.text = text
+        self.signals = RulesParseSignals()
+
+    def run(self):
+        self.signals.finished.emit(self.generation, parse_rules_for_display(self.text))
+
+
+# -------------------------
+# Rule fusion (optional single-pass mode)
+# -------------------------
+# backreferences and conditionals like (?(1)...) inside a pattern would point at the wrong group
+# once it is wrapped in an alternation
+_PATTERN_BACKREF_RE = re.compile(r"\\[1-9]|\(\?P=|\(\?\(")
+
+
+def _make_dispatch(run: list):
+    table = [(creg, repl, "\\" not in repl) for creg, repl in run]
+
+    def dispatch(m):
+        creg, repl, literal = table[int(m.lastgroup[1:])]
+        if literal:
+            return repl
+        # re-match the winning rule on its own so group numbers in repl refer to that rule
+        return creg.match(m.string, m.start()).expand(repl)
+
+    return dispatch
+
+
+# flags that can be scoped to one alternative with (?flags:...)
+_INLINE_FLAGS = (
+    (re.IGNORECASE, "i"),
+    (re.MULTILINE, "m"),
+    (re.DOTALL, "s"),
+    (re.VERBOSE, "x"),
+    (re.ASCII, "a"),
+)
+
+
+def _scoped_pattern(creg: re.Pattern) -> str:
+    letters = "".join(ch for flag, ch in _INLINE_FLAGS if creg.flags & flag)
+    if not letters:
+        return f"(?:{creg.pattern})"
+    # in verbose mode a trailing '# comment' would swallow the closing paren without the newline
+    tail = "\n" if creg.flags & re.VERBOSE else ""
+    return f"(?{letters}:{creg.pattern}{tail})"
+
+
+def fuse_rules(rules: list) -> list:
+    """
+    Merge runs of consecutive (compiled_regex, replacement) rules into a single alternation, so each
+    run is applied in one pass over the text instead of one per rule. Each rule keeps its own flags
+    by scoping them inline to its alternative.
+
+    Within a run the rules are applied simultaneously: at each position the earliest rule that
+    matches wins, and a rule no longer sees the output of the rules before it.
+    Rules whose pattern uses backreferences or conditional groups are never fused.
+    """
+    fused = []
+    run = []
+
+    def flush():
+        if len(run) > 1:
+            try:
+                combined = re.compile(
+                    "|".join(f"(?P<r{i}>{_scoped_pattern(creg)})" for i, (creg, _) in enumerate(run))
+                )
+                fused.append((combined, _make_dispatch(list(run))))
+            except re.error:
+                # e.g. duplicate group names or inline global flags: keep the rules separate
+                fused.extend(run)
+        else:
+            fused.extend(run)
+        run.clear()
+
+    for creg, repl in rules:
+        if _PATTERN_BACKREF_RE.search(creg.pattern):
+            flush()
+            fused.append((creg, repl))
+            continue
+        run.append((creg, repl))
+    flush()
+    return fused
+
+
+# -------------------------
+# Diff rendering
+# -------------------------
+_HUNK_RE = re.compile(r"^@@ -(\d+)(?:,\d+)? \+(\d+)(?:,\d+)? @@")
+
+_DIFF_HEAD = """<!DOCTYPE html>
+<html>
+<head>
+<meta http-equiv="Content-Type" content="text/html; charset=utf-8" />
+<title></title>
+<style type="text/css">
+    table.diff {font-family: Courier, monospace; border: medium; border-collapse: collapse;}
+    .diff td {white-space: pre-wrap; vertical-align: top;}
+    .diff_header {background-color: #e0e0e0; text-align: right;}
+    .diff_next {background-color: #c0c0c0;}
+    .diff_add {background-color: #aaffaa;}
+    .diff_chg {background-color: #ffff77;}
+    .diff_sub {background-color: #ffaaaa;}
+    .diff_hunk {color: #808080;}
+"""
+
+_DIFF_HEAD_END = """</style>
+</head>
+<body>
+"""
+
+_DIFF_TAIL = """
+</body>
+</html>
+"""
+
+# Extra CSS written into diff.html's <style> for the in-app view
+DIFF_VIEW_CSS = """
+    td { font-size: 10pt; }
+    .diff_header {padding-right: 1rem;}
+    /* hide header and left-most columns (the "original" side) */
+    .diff tr > th,
+    .diff th:nth-child(1),
+    .diff th:nth-child(2),
+    .diff th:nth-child(3),
+    .diff td:nth-child(1),
+    .diff td:nth-child(2),
+    .diff td:nth-child(3) {
+        display: none !important;
+    }
+    table.diff { width: 100% !important; }
+"""
+
+_DIFF_TEMPLATE = Template(_DIFF_HEAD + "$css" + _DIFF_HEAD_END + "$body" + _DIFF_TAIL)
+
+NO_CHANGES_HTML = _DIFF_TEMPLATE.substitute(css="", body="<p><i>No changes: the patterns did not modify the text.</i></p>")
+
+# beyond this many lines diff.html only shows changed hunks, not the whole file
+DIFF_FULL_CONTEXT_MAX_LINES = 20_000
+DIFF_CONTEXT_LINES = 3
+
+# QWebEngineView.setHtml() cannot display content over 2 MB (it becomes a data: URL); keep a margin
+SETHTML_MAX_BYTES = 1_000_000
+
+
+def _diff_cell(lineno, text, css_class) -> str:
+    if lineno is None:
+        return '<td class="diff_next"></td><td class="diff_header"></td><td></td>'
+    text = html_mod.escape(text.expandtabs(4))
+    if css_class:
+        text = f'<span class="{css_class}">{text}</span>'
+    return f'<td class="diff_next"></td><td class="diff_header">{lineno}</td><td>{text}</td>'
+
+
+def make_diff_html(orig_lines: list, new_lines: list, fromdesc: str = "", todesc: str = "", extra_css: str = "",
+                   context: int | None = None) -> str:
+    """
+    Side-by-side HTML diff built from unified-diff output (same column layout as difflib.HtmlDiff,
+    so the same CSS tweaks apply). By default full context is requested so the whole file is shown;
+    pass context=N to show only N lines around each change.
+    extra_css is written straight into the <style> block.
+    """
+    head = tail = 0
+    lead = trail = ()
+    if orig_lines == new_lines:
+        # nothing to diff; skip the diff machinery and list the text as context
+        diff_lines = ()
+    else:
+        if context is None:
+            context = max(len(orig_lines), len(new_lines))
+        # lines shared at either end can't be part of a change: only the middle goes through the
+        # diff, and up to `context` of the shared lines on each side are shown as they are
+        n = min(len(orig_lines), len(new_lines))
+        while head < n and orig_lines[head] == new_lines[head]:
+            head += 1
+        while tail < n - head and orig_lines[-1 - tail] == new_lines[-1 - tail]:
+            tail += 1
+        lead = orig_lines[max(head - context, 0):head]
+        trail = orig_lines[len(orig_lines) - tail:][:context]
+        diff_lines = _udiff(orig_lines[head:len(orig_lines) - tail], new_lines[head:len(new_lines) - tail],
+                            fromfile=fromdesc, tofile=todesc, n=context, lineterm="")
+
+    first = head - len(lead) + 1
+    rows = ["<tr>" + _diff_cell(i, text, "") + _diff_cell(i, text, "") + "</tr>"
+            for i, text in enumerate(lead, first)]
+    old_no = new_no = 0
+    removed, added = [], []
+    hunks = 0
+
+    def flush():
+        for old, new in zip_longest(removed, added):
+            if old is not None and new is not None:
+                cls_old = cls_new = "diff_chg"
+            else:
+                cls_old, cls_new = "diff_sub", "diff_add"
+            rows.append("<tr>" + _diff_cell(*(old or (None, None)), cls_old)
+                        + _diff_cell(*(new or (None, None)), cls_new) + "</tr>")
+        removed.clear()
+        added.clear()
+
+    for ln in diff_lines:
+        if ln.startswith("---") or ln.startswith("+++"):
+            continue
+        m = _HUNK_RE.match(ln)
+        if m:
+            flush()
+            old_no, new_no = int(m.group(1)), int(m.group(2))
+            if head:
+                # hunk headers count from the start of the middle slice; show whole-file numbers
+                ln = f"{ln[:m.start(1)]}{old_no + head}{ln[m.end(1):m.start(2)]}{new_no + head}{ln[m.end(2):]}"
+            # an empty side reports its start as 0; numbering below is 1-based
+            old_no = (old_no or 1) + head
+            new_no = (new_no or 1) + head
+            if hunks:
+                hunk = f'<td class="diff_next"></td><td class="diff_header"></td><td class="diff_hunk">{html_mod.escape(ln)}</td>'
+                rows.append("<tr>" + hunk + hunk + "</tr>")
+            hunks += 1
+            continue
+        tag, text = ln[:1], ln[1:]
+        if tag == "-":
+            removed.append((old_no, text))
+            old_no += 1
+        elif tag == "+":
+            added.append((new_no, text))
+            new_no += 1
+        else:
+            flush()
+            rows.append("<tr>" + _diff_cell(old_no, text, "") + _diff_cell(new_no, text, "") + "</tr>")
+            old_no += 1
+            new_no += 1
+    flush()
+
+    old_no, new_no = len(orig_lines) - tail + 1, len(new_lines) - tail + 1
+    rows.extend("<tr>" + _diff_cell(old_no + i, text, "") + _diff_cell(new_no + i, text, "") + "</tr>"
+                for i, text in enumerate(trail))
+
+    # identical inputs produce no hunks at all; still show the text
+    if not rows:
+        rows = ["<tr>" + _diff_cell(i, text, "") + _diff_cell(i, text, "") + "</tr>"
+                for i, text in enumerate(new_lines, 1)]
+
+    caption = (
+        f'<thead><tr><th class="diff_next"><br /></th><th colspan="2" class="diff_header">{html_mod.escape(fromdesc)}</th>'
+        f'<th class="diff_next"><br /></th><th colspan="2" class="diff_header">{html_mod.escape(todesc)}</th></tr></thead>'
+    )
+    body = "".join((
+        '<table class="diff" cellspacing="0" cellpadding="0" rules="groups">\n', caption, "\n<tbody>\n",
+        "\n".join(rows),
+        "\n</tbody>\n</table>",
+    ))
+    return _DIFF_TEMPLATE.substitute(css=extra_css, body=body)
+
+
+# -------------------------
+# Background transform
+# -------------------------
+# keep the intermediate text every this many rules, so a re-run can skip an unchanged leading block
+CHECKPOINT_EVERY = 8
+# each checkpoint is a copy of the text; past this many they are thinned out to half as many
+MAX_CHECKPOINTS = 16
+
+
+def rule_key(rule: tuple) -> tuple:
+    creg, repl = rule
+    return creg.pattern, creg.flags, repl
+
+
+_REGEX_META = frozenset(".^$*+?{}[]\\|()")
+_LITERAL_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "f": "\f", "v": "\v"}
+
+
+@functools.lru_cache(maxsize=1024)
+def required_literal(creg: re.Pattern) -> str:
+    """
+    Literal text every match of creg has to start with (after any leading ^ or \\A), or "" when
+    that can't be worked out cheaply. If it doesn't occur in the text the rule cannot match, and
+    str's substring search is much faster than a failing regex scan.
+    """
+    pat = creg.pattern
+    if creg.flags & (re.IGNORECASE | re.VERBOSE) or "|" in pat:
+        return ""
+    i = 0
+    while True:  # leading anchors are zero-width
+        if pat.startswith("^", i):
+            i += 1
+        elif pat.startswith("\\A", i):
+            i += 2
+        else:
+            break
+    chars = []
+    while i < len(pat):
+        ch = pat[i]
+        if ch == "\\":
+            nxt = pat[i + 1:i + 2]
+            if nxt in _LITERAL_ESCAPES:
+                lit = _LITERAL_ESCAPES[nxt]
+            elif not nxt or (nxt.isascii() and nxt.isalnum()):
+                break  # classes, anchors, backrefs, \x.. etc.
+            else:
+                lit = nxt
+            width = 2
+        elif ch in _REGEX_META:
+            break
+        else:
+            lit = ch
+            width = 1
+        after = pat[i + width:i + width + 1]
+        if after and after in "*?{":
+            break  # this character is optional or repeated: stop before it
+        chars.append(lit)
+        if after == "+":
+            break
+        i += width
+    return "".join(chars)
+
+
+def plain_literal(creg: re.Pattern, repl) -> str:
+    """
+    The pattern text if creg is a plain literal (no metacharacters, case-sensitive) and repl is a
+    string with no escapes or group references; otherwise "". Such a rule is just str.replace().
+    """
+    pat = creg.pattern
+    if (not pat or not isinstance(repl, str) or "\\" in repl
+            or creg.flags & (re.IGNORECASE | re.VERBOSE) or not _REGEX_META.isdisjoint(pat)):
+        return ""
+    return pat
+
+
+class TransformWorker(QObject):
+    """Applies the compiled rules and writes transform.txt (and optionally diff.html) off the GUI thread."""
+    finished = Signal(str, bool, bool)  # (diff html, whether diff.html was written, view must load the file)
+    failed = Signal(str, str)  # (dialog title, message)
+    progress = Signal(int, int)  # (rules applied, total rules)
+
+    # minimum seconds between progress signals, so long rule lists don't flood the GUI thread
+    PROGRESS_INTERVAL = 0.033
+
+    def __init__(self, original_text: str, rules: list, text_path: Path, transform_path: Path, diff_path: Path,
+                 save_diff: bool = True, start_index: int = 0, start_text: str | None = None,
+                 checkpoints: dict | None = None):
+        super().__init__()
+        self.original_text = original_text
+        self.rules = rules
+        self.text_path = text_path
+        self.transform_path = transform_path
+        self.diff_path = diff_path
+        self.save_diff = save_diff
+        # resume after rules[:start_index], whose output is start_text
+        self.start_index = start_index
+        self.start_text = start_text if start_text is not None else original_text
+        # if given, filled with {rules applied: text} every CHECKPOINT_EVERY rules (see MAX_CHECKPOINTS)
+        self.checkpoints = checkpoints
+
+    @Slot()
+    def run(self):
+        transformed = self.start_text
+        total = len(self.rules)
+        last_emit = time.monotonic()
+        every = CHECKPOINT_EVERY
+        try:
+            for done, (creg, repl) in enumerate(self.rules[self.start_index:], self.start_index + 1):
+                lit = plain_literal(creg, repl)
+                if lit:
+                    # e.g. smart quotes -> ASCII: no need to go through the regex engine
+                    transformed = transformed.replace(lit, repl)
+                else:
+                    lit = required_literal(creg)
+                    if not lit or lit in transformed:
+                        transformed = creg.sub(repl, transformed)
+                if self.checkpoints is not None and done % every == 0:
+                    self.checkpoints[done] = transformed
+                    if len(self.checkpoints) > MAX_CHECKPOINTS:
+                        # drop every other checkpoint and store them half as often from here on
+                        for i in sorted(self.checkpoints)[1::2]:
+                            del self.checkpoints[i]
+                        every *= 2
+                now = time.monotonic()
+                if now - last_emit >= self.PROGRESS_INTERVAL:
+                    self.progress.emit(done, total)
+                    last_emit = now
+        except re.error as e:
+            self.failed.emit("Regex error", f"Error while applying regex patterns:\n{e}")
+            return
+        except Exception as e:
+            self.failed.emit("Error", f"Unexpected error while transforming text:\n{e}")
+            return
+
+        try:
+            self.transform_path.write_text(transformed, encoding="utf-8")
+        except Exception as e:
+            self.failed.emit("Error", f"Failed to write transform.txt:\n{e}")
+            return
+
+        try:
+            if transformed == self.original_text:
+                # nothing matched: no point diffing the whole file against itself
+                html = NO_CHANGES_HTML
+            else:
+                orig_lines = self.original_text.splitlines()
+                new_lines = transformed.splitlines()
+                large = max(len(orig_lines), len(new_lines)) > DIFF_FULL_CONTEXT_MAX_LINES
+                html = make_diff_html(orig_lines, new_lines,
+                                      fromdesc=str(self.text_path) if self.text_path else "original",
+                                      todesc=str(self.transform_path),
+                                      extra_css=DIFF_VIEW_CSS,
+                                      context=DIFF_CONTEXT_LINES if large else None)
+
+            # too big to hand to setHtml(), so the view has to load it from disk
+            use_file = len(html.encode("utf-8")) > SETHTML_MAX_BYTES
+            wrote_diff = self.save_diff or use_file
+            if wrote_diff:
+                self.diff_path.write_text(html, encoding="utf-8")
+        except Exception as e:
+            self.failed.emit("Error", f"Failed to generate diff.html:\n{e}")
+            return
+
+        # the GUI thread never needs the text when it loads the file, so don't send it across
+        self.finished.emit("" if use_file else html, wrote_diff, use_file)
+
+
+# -------------------------
+# File loading
+# -------------------------
+# files above this size are read through mmap rather than a buffered read
+LARGE_FILE_BYTES = 10_000_000
+
+
+def decode_text(data) -> str:
+    """Decode UTF-8 (bytes or any buffer) with the same newline translation Path.read_text() applies."""
+    text = str(data, "utf-8")
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
+def read_text_file(path: Path) -> str:
+    if path.stat().st_size <= LARGE_FILE_BYTES:
+        return decode_text(path.read_bytes())
+    with open(path, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        # decode straight from the mapping, without first copying the file into a bytes object
+        return decode_text(mm)
+
+
 # -------------------------
 # Whitespace highlighter
 # -------------------------
+_TABS_RE = re.compile(r"\t+")
+_SPACES_RE = re.compile(r" +")
+_TRAILING_WS_RE = re.compile(r"[ \t]+$")
+
+
 class WhitespaceHighlighter(QSyntaxHighlighter):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -135,16 +649,14 @@ class WhitespaceHighlighter(QSyntaxHighlighter):
         self.trailing_format.setBackground(QColor(255, 220, 220))
 
     def highlightBlock(self, text: str):
-        # tabs
-        for m in re.finditer(r"\t", text):
-            start = m.start()
-            self.setFormat(start, 1, self.tab_format)
+        # tabs (one setFormat per run rather than per character)
+        for m in _TABS_RE.finditer(text):
+            self.setFormat(m.start(), m.end() - m.start(), self.tab_format)
         # spaces
-        for m in re.finditer(r" ", text):
-            start = m.start()
-            self.setFormat(start, 1, self.space_format)
+        for m in _SPACES_RE.finditer(text):
+            self.setFormat(m.start(), m.end() - m.start(), self.space_format)
         # trailing spaces and tabs
-        m = re.search(r"[ \t]+$", text)
+        m = _TRAILING_WS_RE.search(text)
         if m:
             start = m.start()
             length = len(text) - start
@@ -165,8 +677,14 @@ class PatternTransformerMainWindow(QMainWindow):
         self.text_path: Path | None = None
         self.diff_path: Path | None = None
         self.transform_path: Path | None = None
+        # text_view's contents as of loading; the view is read-only, so Run can reuse it
+        self._original_text: str | None = None
 
-        self._last_saved_patterns_text = ""
+        # snapshot of patterns_edit's text, dropped whenever the document changes
+        self._patterns_cache = None
+        self._compiled_rules = None
+        # fuse_rules(_compiled_rules), built on the first single-pass run
+        self._fused_rules = None
 
         # Two highlighter instances (one per editor) so toggle can attach to both documents
         self.whitespace_highlighter_patterns = WhitespaceHighlighter()
@@ -193,6 +711,9 @@ class PatternTransformerMainWindow(QMainWindow):
         self.btn_save_patterns = QPushButton("Save patterns")
         self.btn_help = QPushButton("Help")
         self.chk_show_ws = QCheckBox("Show whitespace")
+        self.chk_fuse_rules = QCheckBox("Single pass (fuse rules)")
+        self.chk_save_diff = QCheckBox("Save diff.html")
+        self.chk_save_diff.setChecked(True)
 
         button_layout.addWidget(self.btn_select_text)
         button_layout.addWidget(self.btn_select_patterns)
@@ -200,6 +721,8 @@ class PatternTransformerMainWindow(QMainWindow):
         button_layout.addWidget(self.btn_save_patterns)
         button_layout.addWidget(self.btn_help)
         button_layout.addWidget(self.chk_show_ws)
+        button_layout.addWidget(self.chk_fuse_rules)
+        button_layout.addWidget(self.chk_save_diff)
         button_layout.addStretch(1)
 
         main_vlayout.addWidget(button_bar)
@@ -285,7 +808,28 @@ class PatternTransformerMainWindow(QMainWindow):
         self.statusBar().showMessage("Ready")
 
         self._rules_line_map = []
-        self.patterns_edit.textChanged.connect(self.update_rules_list)
+        self._transform_thread = None
+        self._transform_worker = None
+        self._run_pass_counts = (0, 0)
+        # intermediate texts from the last sequential run: {rules applied: text}, valid for
+        # _checkpoint_source (the original text object) and the rule keys in _checkpoint_keys
+        self._checkpoints = {}
+        self._checkpoint_keys = []
+        self._checkpoint_source = None
+        self._pending_checkpoints = None
+        # compiled regexes keyed by (pattern, flags); trimmed to the current rules on each compile
+        self._regex_cache = {}
+        self.patterns_edit.document().contentsChanged.connect(self._invalidate_patterns_cache)
+
+        # reparse the rules list once typing pauses, off the GUI thread
+        self._rules_generation = 0
+        self._rules_worker = None
+        self._rules_entries = None
+        self._reparse_timer = QTimer(self)
+        self._reparse_timer.setSingleShot(True)
+        self._reparse_timer.setInterval(150)
+        self._reparse_timer.timeout.connect(self.update_rules_list)
+        self.patterns_edit.textChanged.connect(self._reparse_timer.start)
         self.rules_list.itemClicked.connect(self.on_rule_clicked)
         self.update_rules_list()
 
@@ -293,49 +837,63 @@ class PatternTransformerMainWindow(QMainWindow):
     # helpers
     # -------------------------
     def _patterns_modified(self) -> bool:
-        return self.patterns_edit.toPlainText() != self._last_saved_patterns_text
+        return self.patterns_edit.document().isModified()
+
+    def _patterns_text(self) -> str:
+        if self._patterns_cache is None:
+            self._patterns_cache = self.patterns_edit.toPlainText()
+        return self._patterns_cache
+
+    def _invalidate_patterns_cache(self):
+        self._patterns_cache = None
+        self._compiled_rules = None
+        self._fused_rules = None
+
+    def _compile_rule(self, pat: str, flags: int) -> re.Pattern:
+        key = (pat, flags)
+        creg = self._regex_cache.get(key)
+        if creg is None:
+            creg = re.compile(pat, flags)
+            self._regex_cache[key] = creg
+        return creg
 
     def update_rules_list(self):
-        self.rules_list.clear()
-        self._rules_line_map = []
-        text = self.patterns_edit.toPlainText()
-        lines = text.splitlines()
-        for idx, ln in enumerate(lines):
-            stripped = ln.strip()
-            if not stripped or stripped.startswith("#"):
-                continue
-            try:
-                pat, repl, flags = parse_pattern_line(ln)
-                flag_tokens = flags_to_tokens(flags)
-                flags_display = (", ".join(flag_tokens)) if flag_tokens else ""
-                display = f"{pat}  ->  {repl}"
-                if flags_display:
-                    display += f"   [{flags_display}]"
-                item = QListWidgetItem(display)
-                item.setData(Qt.UserRole, idx)
-                self.rules_list.addItem(item)
-                self._rules_line_map.append(idx)
-            except Exception:
-                item = QListWidgetItem(f"(parse error) {ln}")
-                item.setData(Qt.UserRole, idx)
-                self.rules_list.addItem(item)
-                self._rules_line_map.append(idx)
+        self._reparse_timer.stop()
+        self._rules_generation += 1
+        worker = RulesParseWorker(self._rules_generation, self._patterns_text())
+        worker.signals.finished.connect(self._on_rules_parsed)
+        self._rules_worker = worker  # keep a reference until it reports back
+        QThreadPool.globalInstance().start(worker)
+
+    def _on_rules_parsed(self, generation: int, entries: list):
+        if generation != self._rules_generation:
+            return  # text changed again since this parse started
+        self._rules_worker = None
+        if entries == self._rules_entries:
+            return  # e.g. an edit inside a comment: the list would come out identical
+        self._rules_entries = entries
+        self._rules_line_map = [idx for _, idx in entries]
+        self.rules_list.setUpdatesEnabled(False)
+        try:
+            self.rules_list.clear()
+            self.rules_list.addItems([display for display, _ in entries])
+            for row, idx in enumerate(self._rules_line_map):
+                self.rules_list.item(row).setData(Qt.UserRole, idx)
+        finally:
+            self.rules_list.setUpdatesEnabled(True)
 
     def on_rule_clicked(self, item: QListWidgetItem):
         line_no = item.data(Qt.UserRole)
         if line_no is None:
             return
-        lines = self.patterns_edit.toPlainText().splitlines(True)
-        pos = 0
-        for i in range(min(line_no, len(lines))):
-            pos += len(lines[i])
-        cursor = self.patterns_edit.textCursor()
-        cursor.setPosition(pos)
-        if line_no < len(lines):
-            end_pos = pos + len(lines[line_no])
-            cursor.setPosition(end_pos, QTextCursor.KeepAnchor)
+        # the document already indexes its blocks (one per line); no need to rescan the text
+        block = self.patterns_edit.document().findBlockByNumber(line_no)
+        if block.isValid():
+            cursor = QTextCursor(block)
+            cursor.movePosition(QTextCursor.EndOfBlock, QTextCursor.KeepAnchor)
         else:
-            cursor.setPosition(len(self.patterns_edit.toPlainText()))
+            cursor = self.patterns_edit.textCursor()
+            cursor.movePosition(QTextCursor.End)
         self.patterns_edit.setTextCursor(cursor)
         self.patterns_edit.setFocus()
 
@@ -348,12 +906,12 @@ class PatternTransformerMainWindow(QMainWindow):
             return
         self.patterns_path = Path(path)
         try:
-            text = self.patterns_path.read_text(encoding="utf-8")
+            text = read_text_file(self.patterns_path)
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to read patterns file:\n{e}")
             return
         self.patterns_edit.setPlainText(text)
-        self._last_saved_patterns_text = text
+        self.patterns_edit.document().setModified(False)
         self.statusBar().showMessage(f"Loaded patterns: {self.patterns_path}")
         self.update_rules_list()
 
@@ -363,15 +921,21 @@ class PatternTransformerMainWindow(QMainWindow):
             return
         self.text_path = Path(path)
         try:
-            text = self.text_path.read_text(encoding="utf-8")
+            text = read_text_file(self.text_path)
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to read text file:\n{e}")
             return
         self.text_view.setPlainText(text)
+        # read back once (Qt normalises e.g. non-breaking spaces) so runs see exactly what they did before
+        self._original_text = self.text_view.toPlainText()
         self.statusBar().showMessage(f"Loaded text file: {self.text_path}")
 
     def save_patterns(self):
-        content = self.patterns_edit.toPlainText()
+        if self.patterns_path and not self._patterns_modified() and self.patterns_path.exists():
+            # nothing edited since the last load or save: the file already holds this text
+            self.statusBar().showMessage(f"No changes to save: {self.patterns_path}")
+            return
+        content = self._patterns_text()
         if not self.patterns_path:
             path, _ = QFileDialog.getSaveFileName(self, "Save patterns as", ".", "Text files (*.txt);;All files (*)")
             if not path:
@@ -379,94 +943,153 @@ class PatternTransformerMainWindow(QMainWindow):
             self.patterns_path = Path(path)
         try:
             self.patterns_path.write_text(content, encoding="utf-8")
-            self._last_saved_patterns_text = content
+            self.patterns_edit.document().setModified(False)
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to save patterns file:\n{e}")
             return
         self.statusBar().showMessage(f"Saved patterns to: {self.patterns_path}")
         QMessageBox.information(self, "Saved", f"Patterns saved to:\n{self.patterns_path}")
 
-    def run_patterns(self):
-        if not self.text_path:
-            QMessageBox.warning(self, "No text file", "Please select a text file first (button: Select text file).")
-            return
-        if not self.patterns_edit.toPlainText().strip():
-            QMessageBox.warning(self, "No patterns", "No patterns are loaded or the patterns file is empty.")
-            return
-
-        original_text = self.text_view.toPlainText() or ""
-        patterns_raw = self.patterns_edit.toPlainText().splitlines()
+    def _compile_rules(self) -> list | None:
+        """Parse and compile every rule line; returns None (after reporting) if any regex is invalid."""
+        patterns_raw = self._patterns_text().splitlines()
         rules = []
-        for ln in patterns_raw:
+        regex_errors = []
+        used_keys = set()
+        for idx, ln in enumerate(patterns_raw):
             ln_stripped = ln.strip()
             if not ln_stripped or ln_stripped.startswith("#"):
                 continue
             try:
                 pat, repl, flags = parse_pattern_line(ln)
-                rules.append((pat, repl, flags))
             except Exception as e:
                 QMessageBox.warning(self, "Pattern parse error", f"Failed to parse line:\n{ln}\n\n{e}")
                 continue
+            used_keys.add((pat, flags))
+            try:
+                rules.append((self._compile_rule(pat, flags), repl))
+            except re.error as e:
+                regex_errors.append(f"line {idx + 1}: {pat}\n    {e}")
+
+        # a compiled regex only depends on (pattern, flags), so unchanged rules survive edits;
+        # drop the ones no longer in the file so the cache stays the size of the rule set
+        for key in self._regex_cache.keys() - used_keys:
+            del self._regex_cache[key]
+
+        # compile everything before touching the text, and report every bad rule at once
+        if regex_errors:
+            QMessageBox.critical(self, "Regex error",
+                                 "Invalid regex patterns (nothing was applied):\n\n" + "\n".join(regex_errors))
+            return None
+        return rules
 
-        transformed = original_text
-        try:
-            for pat, repl, flags in rules:
-                transformed = re.sub(pat, repl, transformed, flags=flags)
-        except re.error as e:
-            QMessageBox.critical(self, "Regex error", f"Error while applying regex patterns:\n{e}")
+    def run_patterns(self):
+        if not self.text_path:
+            QMessageBox.warning(self, "No text file", "Please select a text file first (button: Select text file).")
             return
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Unexpected error while transforming text:\n{e}")
+        if not self._patterns_text().strip():
+            QMessageBox.warning(self, "No patterns", "No patterns are loaded or the patterns file is empty.")
             return
 
+        original_text = self._original_text or ""
+        # the compiled rule list is kept until the patterns text changes
+        if self._compiled_rules is None:
+            self._compiled_rules = self._compile_rules()
+            if self._compiled_rules is None:
+                return
+        rules = self._compiled_rules
+
+        # resume from the latest checkpoint whose leading rules are unchanged since the last run
+        start_index, start_text, new_checkpoints = 0, None, None
+        if self.chk_fuse_rules.isChecked():
+            # fusing compiles a new alternation per run of rules; reuse it until the patterns change
+            if self._fused_rules is None:
+                self._fused_rules = fuse_rules(rules)
+            rules = self._fused_rules
+            self._pending_checkpoints = None
+        elif len(original_text) > LARGE_FILE_BYTES:
+            # checkpoints are full copies of the text; for files this size they cost too much memory
+            self._checkpoints, self._checkpoint_keys, self._checkpoint_source = {}, [], None
+            self._pending_checkpoints = None
+        else:
+            keys = [rule_key(r) for r in rules]
+            new_checkpoints = {}
+            if self._checkpoint_source is original_text:
+                common = 0
+                for old_key, key in zip(self._checkpoint_keys, keys):
+                    if old_key != key:
+                        break
+                    common += 1
+                start_index = max((i for i in self._checkpoints if i <= common), default=0)
+                if start_index:
+                    start_text = self._checkpoints[start_index]
+                new_checkpoints = {i: t for i, t in self._checkpoints.items() if i <= start_index}
+            self._pending_checkpoints = (original_text, keys, new_checkpoints)
+        # (rules, passes over the text) for the status message once the run finishes
+        self._run_pass_counts = (len(self._compiled_rules), len(rules))
+
         base_dir = self.text_path.parent if self.text_path and self.text_path.parent else Path.cwd()
         self.transform_path = base_dir / "transform.txt"
         self.diff_path = base_dir / "diff.html"
 
+        # transform + file writes happen on a worker thread; _on_transform_done picks up the result
+        self.btn_run.setEnabled(False)
+        self.statusBar().showMessage("Applying patterns...")
+        thread = QThread(self)
+        worker = TransformWorker(original_text, rules, self.text_path, self.transform_path, self.diff_path,
+                                 save_diff=self.chk_save_diff.isChecked(),
+                                 start_index=start_index, start_text=start_text, checkpoints=new_checkpoints)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.finished.connect(self._on_transform_done)
+        worker.failed.connect(self._on_transform_failed)
+        worker.progress.connect(self._on_transform_progress)
+        worker.finished.connect(thread.quit)
+        worker.failed.connect(thread.quit)
+        thread.finished.connect(worker.deleteLater)
+        thread.finished.connect(thread.deleteLater)
+        thread.finished.connect(self._on_transform_thread_finished)
+        self._transform_thread = thread
+        self._transform_worker = worker
+        thread.start()
+
+    def _on_transform_thread_finished(self):
+        self._transform_thread = None
+        self._transform_worker = None
+
+    def _on_transform_progress(self, done: int, total: int):
+        self.statusBar().showMessage(f"Applying patterns... {done}/{total}")
+
+    def _on_transform_failed(self, title: str, message: str):
+        self.btn_run.setEnabled(True)
+        self._pending_checkpoints = None
+        self.statusBar().showMessage("Run failed")
+        QMessageBox.critical(self, title, message)
+
+    def _on_transform_done(self, html: str, wrote_diff: bool, use_file: bool):
+        self.btn_run.setEnabled(True)
+        if self._pending_checkpoints is not None:
+            # the worker has finished filling the checkpoint dict; adopt it for the next run
+            self._checkpoint_source, self._checkpoint_keys, self._checkpoints = self._pending_checkpoints
+            self._pending_checkpoints = None
         try:
-            self.transform_path.write_text(transformed, encoding="utf-8")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to write transform.txt:\n{e}")
-            return
-
-        try:
-            orig_lines = original_text.splitlines()
-            new_lines = transformed.splitlines()
-            hd = difflib.HtmlDiff(tabsize=4, wrapcolumn=80)
-            html = hd.make_file(orig_lines, new_lines,
-                                fromdesc=str(self.text_path) if self.text_path else "original",
-                                todesc=str(self.transform_path))
-
-            # inject CSS before </style> (HtmlDiff always provides a <style>)
-            css_injection = """
-    td { font-size: 10pt; }
-    .diff_header {padding-right: 1rem;}
-    /* hide header and left-most columns (the "original" side) */
-    .diff tr > th,
-    .diff th:nth-child(1),
-    .diff th:nth-child(2),
-    .diff th:nth-child(3),
-    .diff td:nth-child(1),
-    .diff td:nth-child(2),
-    .diff td:nth-child(3) {
-        display: none !important;
-    }
-    table.diff { width: 100% !important; }
-"""
-            html = html.replace("</style>", css_injection + "</style>", 1)
-            self.diff_path.write_text(html, encoding="utf-8")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to generate diff.html:\n{e}")
-            return
-
-        try:
-            url = QUrl.fromLocalFile(str(self.diff_path.resolve()))
-            self.web_view.load(url)
+            if use_file:
+                url = QUrl.fromLocalFile(str(self.diff_path.resolve()))
+                self.web_view.load(url)
+            else:
+                # show the rendered diff directly; no need to read it back from disk
+                self.web_view.setHtml(html, QUrl.fromLocalFile(str(self.diff_path.parent.resolve()) + "/"))
         except Exception as e:
             QMessageBox.warning(self, "Warning", f"Diff generated but failed to load into web view:\n{e}")
 
-        self.statusBar().showMessage(f"Patterns applied. transform.txt and diff.html saved to: {self.diff_path.parent}")
-        QMessageBox.information(self, "Done", f"Transformed text saved to:\n{self.transform_path}\nDiff saved to:\n{self.diff_path}")
+        n_rules, n_passes = self._run_pass_counts
+        passes = f" ({n_rules} rules in {n_passes} passes)" if n_passes != n_rules else ""
+        if wrote_diff:
+            self.statusBar().showMessage(f"Patterns applied{passes}. transform.txt and diff.html saved to: {self.diff_path.parent}")
+            QMessageBox.information(self, "Done", f"Transformed text saved to:\n{self.transform_path}\nDiff saved to:\n{self.diff_path}")
+        else:
+            self.statusBar().showMessage(f"Patterns applied{passes}. transform.txt saved to: {self.transform_path.parent}")
+            QMessageBox.information(self, "Done", f"Transformed text saved to:\n{self.transform_path}")
         self.update_rules_list()
 
     # -------------------------
@@ -487,7 +1110,12 @@ class PatternTransformerMainWindow(QMainWindow):
             "- Use <code>##</code> to start the flags portion (optional). After <code>##</code> you can write <code>flags: ...</code> or just list flags.<br>"
             "- Flags can be separated by commas, spaces, pipes, or semicolons (e.g. <code>i,m</code> or <code>IGNORECASE MULTILINE</code>).<br>"
             "- Flag names accept: short (i, m, s, x, a), long (IGNORECASE, MULTILINE, DOTALL, VERBOSE, ASCII), or Python-style (re.I).<br><br>"
-            "<b>Behavior</b>: Rules are applied in order to the entire text using <code>re.sub()</code>. MULTILINE is enabled by default."
+            "<b>Behavior</b>: Rules are applied in order to the entire text using <code>re.sub()</code>. MULTILINE is enabled by default.<br><br>"
+            "<b>Single pass</b>: consecutive rules are merged and applied together in one pass (each keeps its own flags). "
+            "At each position the first rule that matches wins, and later rules in the group do not see earlier replacements. "
+            "Rules with backreferences or conditional groups in the pattern are always applied on their own.<br><br>"
+            "<b>Warnings</b>: rules with more than one <code>.*</code> or <code>.+</code> are flagged in the rules list; "
+            "on long text that fails to match they can take a very long time. Prefer a narrower class such as <code>[^,]*</code>."
         )
         QMessageBox.information(self, "Patterns file help", help_text)
 
@@ -514,12 +1142,18 @@ class PatternTransformerMainWindow(QMainWindow):
                 if not self.patterns_path:
                     autosave_path = Path.cwd() / "patterns.txt"
                     self.patterns_path = autosave_path
-                content = self.patterns_edit.toPlainText()
+                content = self._patterns_text()
                 self.patterns_path.write_text(content, encoding="utf-8")
-                self._last_saved_patterns_text = content
+                self.patterns_edit.document().setModified(False)
                 self.statusBar().showMessage(f"Autosaved patterns to: {self.patterns_path}")
         except Exception as e:
             QMessageBox.warning(self, "Autosave failed", f"Failed to autosave patterns:\n{e}")
+        if self._transform_thread is not None:
+            # let a running transform finish writing its files. The worker's finished -> thread.quit
+            # connection is queued to this (blocked) thread, so ask the event loop to stop directly;
+            # quit() takes effect once run() returns
+            self._transform_thread.quit()
+            self._transform_thread.wait()
         event.accept()
 
 